@@ -1,5 +1,6 @@
 """Model manager for loading and managing ML models."""
 
+import json
 import logging
 import os
 import pickle
@@ -15,6 +16,19 @@ from .models import ModelInfo, ModelType
 
 logger = logging.getLogger(__name__)
 
+
+def _single_threaded(model: Any) -> Any:
+    """Pin a loaded model to one thread for request-time scoring.
+
+    Serving scales out with WORKERS/replicas. Limiting threads per model rather
+    than image-wide leaves the retrain scheduler free to train on every core.
+    """
+    if hasattr(model, "set_param"):  # raw xgboost Booster
+        model.set_param({"nthread": 1})
+    elif hasattr(model, "get_params") and "n_jobs" in model.get_params():
+        model.set_params(n_jobs=1)
+    return model
+
 # Optional GCS support
 try:
     from google.cloud import storage
@@ -100,14 +114,22 @@ class ModelManager:
             model_path = self.models_dir / "cpu_forecaster" / "1.0.0" / "model.pkl"
             gcs_path = "cpu_forecaster/1.0.0/model.pkl"
 
+            # Forecasters saved by train_models.py use the native XGBoost format.
+            # Stale files of the other format may linger (gsutil cp never
+            # deletes), so the format recorded with the model decides
+            model_data = None
+            if self._forecaster_format("cpu_forecaster/1.0.0") == "xgboost-json":
+                model_data = self._load_native_forecaster("cpu_forecaster/1.0.0")
+
             # Download from GCS if not exists locally
-            if not model_path.exists() and self.gcs_bucket:
+            if model_data is None and not model_path.exists() and self.gcs_bucket:
                 self._download_from_gcs(gcs_path, model_path)
 
-            if model_path.exists():
+            if model_data is None and model_path.exists():
                 with open(model_path, "rb") as f:
                     model_data = pickle.load(f)
-                
+
+            if model_data is not None:
                 # Check if it's the new portable format
                 if model_data.get("type") == "baseline":
                     # Create a PortableBaseline from saved parameters
@@ -151,6 +173,43 @@ class ModelManager:
             logger.error(f"Failed to load baseline model: {e}")
             return False
 
+    def _forecaster_format(self, model_prefix: str) -> str:
+        """Format recorded in a forecaster's metadata.json ("pickle" if none).
+
+        The file is fetched from GCS if missing locally. Every writer records
+        the format it saved, so this tells which model files are current.
+        """
+        path = self.models_dir / model_prefix / "metadata.json"
+        if not path.exists() and not self._download_from_gcs(
+            f"{model_prefix}/metadata.json", path
+        ):
+            return "pickle"
+        try:
+            return json.loads(path.read_text()).get("format", "pickle")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable forecaster metadata {path}: {e}")
+            return "pickle"
+
+    def _load_native_forecaster(self, model_prefix: str) -> Optional[dict[str, Any]]:
+        """Load an XGBoost forecaster saved as model.json + scaler.joblib.
+
+        Files missing locally are fetched from GCS. Returns None if the model
+        is not available in this format.
+        """
+        model_dir = self.models_dir / model_prefix
+        paths = [model_dir / "model.json", model_dir / "scaler.joblib"]
+        for path in paths:
+            if not path.exists() and not self._download_from_gcs(
+                f"{model_prefix}/{path.name}", path
+            ):
+                return None
+
+        import xgboost as xgb
+
+        model = xgb.XGBRegressor()
+        model.load_model(paths[0])
+        return {"model": model, "scaler": joblib.load(paths[1])}
+
     def _load_prophet(self) -> bool:
         """Load Prophet model."""
         try:
@@ -439,7 +498,7 @@ class TrainedForecaster:
     """Wrapper for trained XGBoost forecasting model."""
 
     def __init__(self, model: Any, scaler: Any, lookback: int = 12):
-        self.model = model
+        self.model = _single_threaded(model)
         self.scaler = scaler
         self.lookback = lookback
         self._history: dict[str, list[float]] = {}
@@ -505,7 +564,7 @@ class TrainedAnomalyDetector:
     """Wrapper for trained Isolation Forest anomaly detector."""
 
     def __init__(self, model: Any, scaler: Any, threshold_sigma: float = 2.5):
-        self.model = model  # IsolationForest
+        self.model = _single_threaded(model)  # IsolationForest
         self.scaler = scaler
         self.threshold_sigma = threshold_sigma
         self._stats: dict[str, dict[str, float]] = {}
@@ -9,6 +9,7 @@ Background asyncio task that periodically:
 """
 
 import asyncio
+import json
 import logging
 import sys
 import traceback
@@ -381,6 +382,16 @@ class RetrainScheduler:
                     "window": baseline.window,
                     "trend_window": getattr(baseline, "trend_window", 6),
                 }, f)
+            # Record the format so the loader ignores an older model.json
+            (baseline_dir / "model.json").unlink(missing_ok=True)
+            with open(baseline_dir / "metadata.json", "w") as f:
+                json.dump({
+                    "name": "cpu_forecaster",
+                    "version": "1.0.0",
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "framework": "baseline",
+                    "format": "pickle",
+                }, f, indent=2)
             logger.info(f"Saved baseline model to {baseline_dir}")
 
         # Save Prophet
@@ -0,0 +1,30 @@
+"""
+Forecast error metrics shared by the forecasting models.
+"""
+
+import numpy as np
+
+
+def forecast_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> dict[str, float]:
+    """
+    MAE, MSE, RMSE and MAPE (percent, relative to y_true + 1e-8) of a forecast.
+
+    The error array is allocated once and every later step works on it in
+    place, rather than building a fresh temporary per expression.
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    err = np.subtract(y_true, y_pred, dtype=np.float64)
+
+    mse = np.dot(err, err) / err.size
+    np.abs(err, out=err)
+    mae = err.mean()
+    np.divide(err, y_true + 1e-8, out=err)
+    np.abs(err, out=err)
+    mape = err.mean() * 100
+
+    return {
+        "mae": mae,
+        "mse": mse,
+        "rmse": np.sqrt(mse),
+        "mape": mape,
+    }
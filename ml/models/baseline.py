@@ -11,6 +11,8 @@ from typing import Optional
 import numpy as np
 import pandas as pd
 
+from ._metrics import forecast_metrics
+
 
 @dataclass
 class BaselinePrediction:
@@ -148,10 +150,8 @@ class BaselineModel:
         y_pred = pred.forecast
 
         # Calculate metrics
-        mae = np.mean(np.abs(y_true - y_pred))
-        mse = np.mean((y_true - y_pred) ** 2)
-        rmse = np.sqrt(mse)
-        mape = np.mean(np.abs((y_true - y_pred) / (y_true + 1e-8))) * 100
+        metrics = forecast_metrics(y_true, y_pred)
+        mae = metrics["mae"]
 
         # Naive baseline: predict last value
         naive_pred = np.full_like(y_true, y_train[-1])
@@ -161,10 +161,7 @@ class BaselineModel:
         skill_score = 1 - (mae / naive_mae) if naive_mae > 0 else 0
 
         return {
-            "mae": mae,
-            "mse": mse,
-            "rmse": rmse,
-            "mape": mape,
+            **metrics,
             "skill_score": skill_score,
             "trend": self.trend_,
             "moving_average": self.moving_average_,
@@ -12,6 +12,8 @@ import numpy as np
 import pandas as pd
 from prophet import Prophet
 
+from ._metrics import forecast_metrics
+
 # Suppress Prophet's verbose logging
 logging.getLogger("prophet").setLevel(logging.WARNING)
 logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
@@ -237,10 +239,7 @@ class ProphetForecaster:
         y_pred = forecast["yhat"].values[: len(y_true)]
 
         # Calculate metrics
-        mae = np.mean(np.abs(y_true - y_pred))
-        mse = np.mean((y_true - y_pred) ** 2)
-        rmse = np.sqrt(mse)
-        mape = np.mean(np.abs((y_true - y_pred) / (y_true + 1e-8))) * 100
+        metrics = forecast_metrics(y_true, y_pred)
 
         # Coverage: % of actuals within prediction intervals
         lower = forecast["yhat_lower"].values[: len(y_true)]
@@ -248,10 +247,7 @@ class ProphetForecaster:
         coverage = np.mean((y_true >= lower) & (y_true <= upper)) * 100
 
         return {
-            "mae": mae,
-            "mse": mse,
-            "rmse": rmse,
-            "mape": mape,
+            **metrics,
             "coverage": coverage,
             "train_size": len(train_df),
             "test_size": len(test_df),
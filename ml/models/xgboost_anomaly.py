@@ -5,14 +5,29 @@ Supervised anomaly detection using XGBoost for infrastructure metrics.
 Detects unusual patterns in multi-variate time series data.
 """
 
+import asyncio
+import threading
 from dataclasses import dataclass
-from typing import Optional
+from itertools import islice
+from typing import TYPE_CHECKING, Optional
 
 import numpy as np
 import pandas as pd
-import xgboost as xgb
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
+
+# xgboost/sklearn are imported where they are used, so importing this module
+# (e.g. for AnomalyResult) does not load them. It is not free: numba, when
+# installed, is imported below, and the models package __init__ imports prophet
+if TYPE_CHECKING:
+    import xgboost as xgb
+    from sklearn.preprocessing import StandardScaler
+
+# Optional: numba for the fused evaluation kernel
+try:
+    from numba import njit, prange
+
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
 
 
 @dataclass
@@ -26,6 +41,89 @@ class AnomalyResult:
     feature_importance: dict[str, float]
 
 
+def _eval_stats_numpy(
+    scores: np.ndarray, labels: np.ndarray, threshold: float
+) -> tuple[np.ndarray, int, int, int, int, float, float, float]:
+    """Classify scores and count TP/FP/FN with plain numpy."""
+    hit = scores > threshold
+    positive = labels == 1
+    return (
+        hit.view(np.uint8),
+        int(hit.sum()),
+        int(np.sum(hit & positive)),
+        int(np.sum(hit & (labels == 0))),
+        int(np.sum(~hit & positive)),
+        float(np.mean(scores)),
+        float(np.max(scores)),
+        float(np.std(scores)),
+    )
+
+
+if HAS_NUMBA:
+
+    @njit(parallel=True, cache=True)
+    def _eval_kernel(scores, labels, threshold):
+        """
+        Predictions and counts in one pass over scores/labels, then the score
+        deviations in a second (two-pass variance, as accurate as np.std).
+
+        No fastmath: NaN scores must propagate to mean/max/std as in numpy.
+        """
+        n = scores.shape[0]
+        predictions = np.empty(n, dtype=np.uint8)
+        count = 0
+        tp = 0
+        fp = 0
+        fn = 0
+        total = 0.0
+        n_nan = 0
+        for i in prange(n):
+            s = scores[i]
+            p = 1 if s > threshold else 0
+            pos = 1 if labels[i] == 1 else 0
+            neg = 1 if labels[i] == 0 else 0
+            predictions[i] = p
+            count += p
+            tp += p * pos
+            fp += p * neg
+            fn += (1 - p) * pos
+            total += s
+            n_nan += 1 if np.isnan(s) else 0
+        mean = total / n
+        sq_dev = 0.0
+        for i in prange(n):
+            d = scores[i] - mean
+            sq_dev += d * d
+        # numba's np.max skips NaN; numpy's returns it
+        peak = np.nan if n_nan else np.max(scores)
+        return predictions, count, tp, fp, fn, mean, peak, np.sqrt(sq_dev / n)
+
+
+def _eval_stats(
+    scores: np.ndarray, labels: Optional[np.ndarray], threshold: float
+) -> tuple[np.ndarray, int, int, int, int, float, float, float]:
+    """
+    Classify scores against threshold and gather evaluation statistics.
+
+    Returns:
+        (predictions, n_anomalies, tp, fp, fn, mean_score, max_score, std_score).
+        TP/FP/FN are zero when no labels are given.
+    """
+    scores = np.ascontiguousarray(scores, dtype=np.float64)
+    if labels is None:
+        # -1 is neither anomaly nor normal, so nothing is counted
+        labels = np.full(len(scores), -1, dtype=np.int64)
+    else:
+        labels = np.ascontiguousarray(labels, dtype=np.int64)
+
+    if HAS_NUMBA:
+        predictions, count, tp, fp, fn, mean, peak, std = _eval_kernel(
+            scores, labels, float(threshold)
+        )
+        return predictions, int(count), int(tp), int(fp), int(fn), mean, peak, std
+    return _eval_stats_numpy(scores, labels, threshold)
+
+
 class XGBoostAnomalyDetector:
     """
     XGBoost-based anomaly detector using reconstruction error.
@@ -39,6 +137,11 @@ class XGBoostAnomalyDetector:
     - Multi-variate anomaly detection
     - Detecting unusual relationships between metrics
     - Catching issues like "CPU high but RPS low" (unusual)
+
+    Scoring runs single-threaded by default (n_jobs=1) while fit uses every
+    core (fit_n_jobs=-1). Scale the serving tier out with more worker
+    processes rather than giving one worker every core, which contends under
+    concurrent requests.
     """
 
     def __init__(
@@ -48,6 +151,8 @@ class XGBoostAnomalyDetector:
         learning_rate: float = 0.1,
         threshold_sigma: float = 2.5,
         contamination: float = 0.05,
+        n_jobs: int = 1,
+        fit_n_jobs: int = -1,
     ):
         """
         Initialize anomaly detector.
@@ -58,29 +163,53 @@ class XGBoostAnomalyDetector:
             learning_rate: Learning rate
             threshold_sigma: Standard deviations for anomaly threshold
             contamination: Expected proportion of anomalies (for percentile threshold)
+            n_jobs: Threads used for scoring after fit
+            fit_n_jobs: Threads used while training (-1 = all cores)
         """
         self.n_estimators = n_estimators
         self.max_depth = max_depth
         self.learning_rate = learning_rate
         self.threshold_sigma = threshold_sigma
         self.contamination = contamination
+        self.n_jobs = n_jobs
+        self.fit_n_jobs = fit_n_jobs
 
-        self.model_: Optional[xgb.XGBRegressor] = None
+        self.model_: Optional[xgb.Booster] = None
         self.scaler_: Optional[StandardScaler] = None
         self.threshold_: Optional[float] = None
         self.feature_names_: list[str] = []
         self.is_fitted_: bool = False
+        # Importances are fixed once trained; sorted once at the end of fit
+        self._sorted_importance: dict[str, float] = {}
+        # Per-thread reusable float32 scaling buffers for scoring (grown on demand)
+        self._local = threading.local()
+        # Precision the scaler was fitted in; scoring must round the same way
+        self._scale_dtype: type = np.float32
+
+    def _booster_params(self, n_jobs: int = 1) -> dict:
+        """Native XGBoost training parameters."""
+        return {
+            "objective": "reg:squarederror",
+            "max_depth": self.max_depth,
+            "learning_rate": self.learning_rate,
+            "tree_method": "hist",
+            "seed": 42,
+            "nthread": n_jobs,
+        }
 
-    def _create_model(self) -> xgb.XGBRegressor:
-        """Create XGBoost regressor."""
-        return xgb.XGBRegressor(
-            n_estimators=self.n_estimators,
-            max_depth=self.max_depth,
-            learning_rate=self.learning_rate,
-            objective="reg:squarederror",
-            random_state=42,
-            n_jobs=-1,
-        )
+    def _feature_importance(self) -> dict[str, float]:
+        """Normalized gain importance per feature (0 for unused features)."""
+        gain = self.model_.get_score(importance_type="gain")
+        total = sum(gain.values())
+        return {
+            name: (gain.get(name, 0.0) / total if total else 0.0)
+            for name in self.feature_names_
+        }
+
+    def _sort_importance(self) -> dict[str, float]:
+        """Feature importance, most important first."""
+        importance = self._feature_importance()
+        return dict(sorted(importance.items(), key=lambda x: x[1], reverse=True))
 
     def fit(
         self,
@@ -99,42 +228,174 @@ class XGBoostAnomalyDetector:
         Returns:
             self
         """
-        self.feature_names_ = list(X.columns)
+        import xgboost as xgb
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
 
-        # Scale features
-        self.scaler_ = StandardScaler()
-        X_scaled = self.scaler_.fit_transform(X)
+        self.feature_names_ = [str(c) for c in X.columns]
+        self._local = threading.local()
+
+        # Scale features in float32, xgboost's native format, so nothing re-copies
+        X_f32 = np.array(X.values, dtype=np.float32, order="C")
+        self.scaler_ = StandardScaler(copy=False)
+        X_scaled = self.scaler_.fit_transform(X_f32)
+        # The scaler is saved and used by inference: stop it writing in place
+        self.scaler_.copy = True
 
         # Split for validation
         X_train, X_val, y_train, y_val = train_test_split(
             X_scaled, y, test_size=validation_split, random_state=42
         )
 
-        # Train model
-        self.model_ = self._create_model()
-        self.model_.fit(
-            X_train,
-            y_train,
-            eval_set=[(X_val, y_val)],
-            verbose=False,
+        # Train on quantized DMatrices directly; the sklearn wrapper would
+        # rebuild a DMatrix internally and keep its own copy of the data
+        dtrain = xgb.QuantileDMatrix(
+            X_train, label=y_train, feature_names=self.feature_names_
         )
+        dval = xgb.QuantileDMatrix(
+            X_val, label=y_val, feature_names=self.feature_names_, ref=dtrain
+        )
+        self.model_ = xgb.train(
+            self._booster_params(n_jobs=self.fit_n_jobs),
+            dtrain,
+            num_boost_round=self.n_estimators,
+            evals=[(dval, "val")],
+            verbose_eval=False,
+        )
+
+        # Training is done; drop back to the serving thread count
+        self.model_.set_param({"nthread": self.n_jobs})
 
         # Calculate threshold based on training errors
-        train_pred = self.model_.predict(X_scaled)
-        errors = np.abs(y.values - train_pred)
+        train_pred = self.model_.inplace_predict(X_scaled)
+        errors = np.subtract(
+            y.to_numpy(dtype=np.float32), train_pred, out=np.empty_like(train_pred)
+        )
+        np.abs(errors, out=errors)
 
         # Use either sigma-based or percentile threshold
-        mean_error = np.mean(errors)
-        std_error = np.std(errors)
+        mean_error = errors.mean()
+        std_error = errors.std()
         sigma_threshold = mean_error + self.threshold_sigma * std_error
-        percentile_threshold = np.percentile(errors, (1 - self.contamination) * 100)
+        self.threshold_ = float(sigma_threshold)
+
+        if self.contamination > 0:
+            # Selection instead of a full sort; errors is scratch so partition in place
+            k = min(int((1 - self.contamination) * errors.size), errors.size - 1)
+            errors.partition(k)
+            percentile_threshold = errors[k]
 
-        # Use the more conservative (higher) threshold
-        self.threshold_ = max(sigma_threshold, percentile_threshold)
+            # Use the more conservative (higher) threshold
+            self.threshold_ = float(max(sigma_threshold, percentile_threshold))
+
+        self._sorted_importance = self._sort_importance()
 
         self.is_fitted_ = True
+        self.warmup()
         return self
 
+    def warmup(self) -> None:
+        """
+        Run one dummy prediction through the booster.
+
+        The first inplace_predict pays for predictor and thread-pool setup
+        (tens of ms); doing it here keeps that off the first real request.
+        """
+        if self.model_ is None:
+            return
+        self.model_.inplace_predict(np.zeros((1, len(self.feature_names_)), dtype=np.float32))
+
+    def __getstate__(self) -> dict:
+        """Pickle without the per-thread scratch scaling buffers."""
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restore a pickled detector and warm the booster before first use.
+
+        Detectors pickled before training moved to a native Booster hold an
+        XGBRegressor and lack the newer attributes; those are upgraded here.
+        """
+        # Older pickles carry a single shared buffer instead
+        state.pop("_X_buf", None)
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self.__dict__.setdefault("n_jobs", 1)
+        self.__dict__.setdefault("fit_n_jobs", -1)
+        # Older detectors scaled (and trained) in float64
+        self.__dict__.setdefault("_scale_dtype", np.float64)
+        self.feature_names_ = [str(c) for c in self.feature_names_]
+
+        if self.model_ is None:
+            return
+        # Unpickling the model has already imported xgboost
+        import xgboost as xgb
+
+        if isinstance(self.model_, xgb.XGBModel):
+            self.model_ = self.model_.get_booster()
+            self.model_.set_param({"nthread": self.n_jobs})
+        if self.model_.feature_names is None:
+            # Trained on a bare array; name features so importances resolve
+            self.model_.feature_names = self.feature_names_
+        if "_sorted_importance" not in state:
+            self._sorted_importance = self._sort_importance()
+        if self.is_fitted_:
+            self.warmup()
+
+    def _scale(self, X: np.ndarray) -> np.ndarray:
+        """
+        Standardize X into this thread's reusable float32 buffer.
+
+        Returns a view of the first len(X) rows, valid until the same thread
+        calls again. Buffers are per thread, so concurrent predict calls never
+        share one, and steady-state scoring allocates nothing for the features.
+        """
+        n_features = len(self.feature_names_)
+        if X.ndim != 2 or X.shape[1] != n_features:
+            # copyto below would broadcast a single column instead of failing
+            raise ValueError(
+                f"X has {X.shape[-1]} features, but {type(self).__name__} "
+                f"is expecting {n_features} features as input"
+            )
+
+        n = len(X)
+        buf = getattr(self._local, "X_buf", None)
+        if buf is None or buf.shape[0] < n:
+            buf = self._local.X_buf = np.empty((max(n, 1024), n_features), dtype=np.float32)
+        scaled = buf[:n]
+        if self._scale_dtype is np.float64:
+            # Scaled in float64 and rounded once, as the trees were trained
+            np.divide(X - self.scaler_.mean_, self.scaler_.scale_, out=scaled, casting="unsafe")
+            return scaled
+        # Same float32 arithmetic as StandardScaler.transform did during fit
+        np.copyto(scaled, X, casting="unsafe")
+        scaled -= self.scaler_.mean_.astype(np.float32)
+        scaled /= self.scaler_.scale_.astype(np.float32)
+        return scaled
+
+    def _scores(self, X: pd.DataFrame, y: pd.Series) -> np.ndarray:
+        """Absolute prediction errors for fitted model."""
+        # The scaler is fitted on a bare array and _scale bypasses its
+        # transform, so nothing else checks the columns
+        columns = [str(c) for c in X.columns]
+        if columns != self.feature_names_:
+            raise ValueError(
+                f"X has features {columns}, but {type(self).__name__} was fitted "
+                f"with {self.feature_names_}; names and order must match"
+            )
+        return self._score_matrix(X.to_numpy(), y.to_numpy(dtype=np.float32))
+
+    def _score_matrix(self, X: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Absolute prediction errors for a raw (unscaled) feature matrix."""
+        # Get predictions on the scaled view
+        y_pred = self.model_.inplace_predict(self._scale(X))
+
+        # Calculate anomaly scores (absolute errors)
+        scores = np.subtract(y, y_pred, out=y_pred)
+        return np.abs(scores, out=scores)
+
     def predict(self, X: pd.DataFrame, y: pd.Series) -> AnomalyResult:
         """
         Detect anomalies in new data.
@@ -149,30 +410,21 @@ class XGBoostAnomalyDetector:
         if not self.is_fitted_:
             raise ValueError("Model must be fitted before prediction")
 
-        # Scale features
-        X_scaled = self.scaler_.transform(X)
-
-        # Get predictions
-        y_pred = self.model_.predict(X_scaled)
-
-        # Calculate anomaly scores (absolute errors)
-        scores = np.abs(y.values - y_pred)
-
-        # Classify anomalies
-        predictions = (scores > self.threshold_).astype(int)
-        anomaly_indices = np.where(predictions == 1)[0]
+        scores = self._scores(X, y)
 
-        # Get feature importance
-        importance = dict(zip(self.feature_names_, self.model_.feature_importances_))
-        # Sort by importance
-        importance = dict(sorted(importance.items(), key=lambda x: x[1], reverse=True))
+        # Classify anomalies: one comparison pass; predictions are a uint8
+        # (0/1) view of the mask rather than a second int64 array
+        mask = scores > self.threshold_
+        anomaly_indices = np.flatnonzero(mask)
+        predictions = mask.view(np.uint8)
 
         return AnomalyResult(
             scores=scores,
             predictions=predictions,
             threshold=self.threshold_,
             anomaly_indices=anomaly_indices,
-            feature_importance=importance,
+            # A copy: callers may modify their result's dict
+            feature_importance=dict(self._sorted_importance),
         )
 
     def score_anomalies(
@@ -215,25 +467,27 @@ class XGBoostAnomalyDetector:
         Returns:
             Dictionary of evaluation metrics
         """
-        result = self.predict(X, y)
+        if not self.is_fitted_:
+            raise ValueError("Model must be fitted before prediction")
+
+        scores = self._scores(X, y)
+        _, n_detected, tp, fp, fn, mean_score, max_score, std_score = _eval_stats(
+            scores, y_anomaly_labels, self.threshold_
+        )
 
         metrics = {
             "threshold": self.threshold_,
-            "n_anomalies_detected": len(result.anomaly_indices),
-            "anomaly_rate": len(result.anomaly_indices) / len(y),
-            "mean_score": np.mean(result.scores),
-            "max_score": np.max(result.scores),
-            "std_score": np.std(result.scores),
+            "n_anomalies_detected": n_detected,
+            "anomaly_rate": n_detected / len(y),
+            "mean_score": mean_score,
+            "max_score": max_score,
+            "std_score": std_score,
         }
 
         # If true labels provided, calculate precision/recall
         if y_anomaly_labels is not None:
-            true_positives = np.sum((result.predictions == 1) & (y_anomaly_labels == 1))
-            false_positives = np.sum((result.predictions == 1) & (y_anomaly_labels == 0))
-            false_negatives = np.sum((result.predictions == 0) & (y_anomaly_labels == 1))
-
-            precision = true_positives / (true_positives + false_positives + 1e-8)
-            recall = true_positives / (true_positives + false_negatives + 1e-8)
+            precision = tp / (tp + fp + 1e-8)
+            recall = tp / (tp + fn + 1e-8)
             f1 = 2 * precision * recall / (precision + recall + 1e-8)
 
             metrics.update(
@@ -251,10 +505,133 @@ class XGBoostAnomalyDetector:
         if not self.is_fitted_:
             raise ValueError("Model must be fitted first")
 
-        importance = dict(zip(self.feature_names_, self.model_.feature_importances_))
-        sorted_importance = dict(sorted(importance.items(), key=lambda x: x[1], reverse=True)[:n])
+        return dict(islice(self._sorted_importance.items(), n))
+
+
+class BatchedAnomalyScorer:
+    """
+    Coalesces single-row scoring calls into batched booster predictions.
+
+    Streaming callers score one row at a time; each await is queued and a
+    worker task flushes the queue as one inplace_predict once batch_size rows
+    are waiting or timeout_ms has passed since the first one arrived. Trades up
+    to timeout_ms of latency for far fewer per-call booster overheads.
+    """
+
+    def __init__(
+        self,
+        detector: XGBoostAnomalyDetector,
+        batch_size: int = 64,
+        timeout_ms: float = 5.0,
+    ):
+        """
+        Initialize the scorer.
+
+        Args:
+            detector: Fitted XGBoostAnomalyDetector
+            batch_size: Max rows per booster call
+            timeout_ms: Max time to wait for a batch to fill
+        """
+        if not detector.is_fitted_:
+            raise ValueError("Model must be fitted before prediction")
+
+        self.detector = detector
+        self.batch_size = batch_size
+        self.timeout_ms = timeout_ms
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Rows taken off the queue but not yet dispatched
+        self._batch: list[tuple[np.ndarray, float, asyncio.Future]] = []
+
+    def start(self):
+        """Start the background batching worker, keeping any queued rows."""
+        if self._task is not None and not self._task.done():
+            return  # already running; a second worker would share the queue
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._batch_loop())
+
+    def stop(self):
+        """Stop the worker; rows queued or mid-batch fail with RuntimeError."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+        pending = self._batch
+        self._batch = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._fail(pending, RuntimeError("BatchedAnomalyScorer stopped before scoring"))
+
+    async def score(self, x: np.ndarray, y: float) -> float:
+        """
+        Score a single row.
+
+        Args:
+            x: Feature vector, ordered like detector.feature_names_
+            y: Actual target value
+
+        Returns:
+            Anomaly score (absolute prediction error)
+        """
+        if self._task is None or self._task.done():
+            self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((x, y, future))
+        return await future
+
+    async def is_anomaly(self, x: np.ndarray, y: float) -> bool:
+        """Check if a single row is an anomaly."""
+        return await self.score(x, y) > self.detector.threshold_
+
+    async def _batch_loop(self):
+        """Collect up to batch_size rows (or until timeout) and dispatch them."""
+        loop = asyncio.get_running_loop()
+        timeout = self.timeout_ms / 1000
+
+        while True:
+            self._batch = batch = [await self._queue.get()]
+            deadline = loop.time() + timeout
+
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            self._batch = []
+            self._dispatch(batch)
+
+    @staticmethod
+    def _fail(batch: list[tuple[np.ndarray, float, asyncio.Future]], error: Exception):
+        """Resolve every still-pending future in batch with error."""
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def _dispatch(self, batch: list[tuple[np.ndarray, float, asyncio.Future]]):
+        """
+        Score a batch in one booster call and resolve each row's future.
+
+        Any error (e.g. a row of the wrong length) fails only this batch's
+        futures; the worker carries on with the next batch.
+        """
+        try:
+            rows = np.stack([np.asarray(x, dtype=np.float32) for x, _, _ in batch])
+            targets = np.fromiter((y for _, y, _ in batch), dtype=np.float32, count=len(batch))
+            scores = self.detector._score_matrix(rows, targets)
+        except Exception as e:
+            self._fail(batch, e)
+            return
 
-        return sorted_importance
+        for (_, _, future), score in zip(batch, scores):
+            if not future.done():
+                future.set_result(float(score))
 
 
 class IsolationForestAnomalyDetector:
@@ -272,6 +649,7 @@ class IsolationForestAnomalyDetector:
         random_state: int = 42,
     ):
         from sklearn.ensemble import IsolationForest
+        from sklearn.preprocessing import StandardScaler
 
         self.contamination = contamination
         self.n_estimators = n_estimators
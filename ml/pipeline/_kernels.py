@@ -0,0 +1,229 @@
+"""
+Numeric kernels for feature engineering.
+
+Lag and rolling-window features over an [N, C] block of metric columns.
+Blocks are expected column-major (F order) so the row loops are stride-1.
+With numba installed these run as compiled loops parallel across columns;
+otherwise numpy/bottleneck (or pandas) fallbacks give the same results.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Optional: numba for compiled, column-parallel kernels. No fastmath: the
+# kernels rely on NaN semantics
+try:
+    from numba import njit, prange
+
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Optional: bottleneck for single-pass moving-window statistics
+try:
+    import bottleneck as bn
+
+    HAS_BOTTLENECK = True
+except ImportError:
+    HAS_BOTTLENECK = False
+
+
+# One any-layout signature per dtype, so F-ordered blocks, single columns
+# (which numba types as C-contiguous) and strided output views all share one
+# overload. Each is compiled on first use, or loaded from numba's on-disk
+# cache, rather than at import: a cold import compiles nothing, and a run
+# compiles only the dtype it uses
+_LAG_SIGNATURE = "void({t}[:, :], int64[:], {t}[:, :, :])"
+_ROLLING_SIGNATURE = (
+    "void({t}[:, :], int64[:], {t}[:, :, :], {t}[:, :, :], {t}[:, :, :], {t}[:, :, :])"
+)
+_compiled_kernels: dict = {}
+
+
+def _compiled(func, signature: str, dtype: np.dtype):
+    """func compiled (parallel, cached) for signature at dtype, on first use."""
+    key = (func.__name__, np.dtype(dtype).name)
+    if key not in _compiled_kernels:
+        # Explicit signatures also stop numba compiling per-layout variants
+        _compiled_kernels[key] = njit(signature.format(t=key[1]), parallel=True, cache=True)(
+            func
+        )
+    return _compiled_kernels[key]
+
+
+if HAS_NUMBA:
+
+    def _lags_loop(arr, lags, out):
+        """out[:, c, k] = arr[:, c] shifted down by lags[k], NaN-filled."""
+        n, n_cols = arr.shape
+        for c in prange(n_cols):
+            for k in range(lags.shape[0]):
+                # Row-inner: column-major inputs/outputs stream contiguously
+                lag = lags[k]
+                for i in range(n):
+                    j = i - lag
+                    out[i, c, k] = arr[j, c] if 0 <= j < n else np.nan
+
+    def _rolling_loop(arr, windows, out_mean, out_std, out_min, out_max):
+        """
+        Trailing mean/std/min/max for every column and window in one pass each.
+
+        Mean and variance use a sliding Welford update (accumulated in
+        float64 whatever the input dtype); min and max use
+        monotonic deques (ring buffers of indices). Any NaN (or inf, which
+        pandas rolling treats as NaN) in the window gives NaN, so state
+        restarts after each such value.
+        """
+        n, n_cols = arr.shape
+        for c in prange(n_cols):
+            for k in range(windows.shape[0]):
+                w = windows[k]
+                min_q = np.empty(w + 1, dtype=np.int64)
+                max_q = np.empty(w + 1, dtype=np.int64)
+                min_head = min_tail = 0
+                max_head = max_tail = 0
+                run = 0  # consecutive non-NaN values ending at i
+                mean = 0.0
+                m2 = 0.0
+                for i in range(n):
+                    x = np.float64(arr[i, c])
+                    if not np.isfinite(x):
+                        run = 0
+                        min_head = min_tail = 0
+                        max_head = max_tail = 0
+                        out_mean[i, c, k] = np.nan
+                        out_std[i, c, k] = np.nan
+                        out_min[i, c, k] = np.nan
+                        out_max[i, c, k] = np.nan
+                        continue
+                    run += 1
+
+                    # Evict indices that left the window, then keep deques monotonic
+                    if min_head != min_tail and min_q[min_head % (w + 1)] <= i - w:
+                        min_head += 1
+                    while min_head != min_tail and arr[min_q[(min_tail - 1) % (w + 1)], c] >= x:
+                        min_tail -= 1
+                    min_q[min_tail % (w + 1)] = i
+                    min_tail += 1
+                    if max_head != max_tail and max_q[max_head % (w + 1)] <= i - w:
+                        max_head += 1
+                    while max_head != max_tail and arr[max_q[(max_tail - 1) % (w + 1)], c] <= x:
+                        max_tail -= 1
+                    max_q[max_tail % (w + 1)] = i
+                    max_tail += 1
+
+                    if run < w:
+                        out_mean[i, c, k] = np.nan
+                        out_std[i, c, k] = np.nan
+                        out_min[i, c, k] = np.nan
+                        out_max[i, c, k] = np.nan
+                        continue
+
+                    if run == w:
+                        # First full window after a restart: compute directly
+                        mean = 0.0
+                        for j in range(i - w + 1, i + 1):
+                            mean += arr[j, c]
+                        mean /= w
+                        m2 = 0.0
+                        for j in range(i - w + 1, i + 1):
+                            d = arr[j, c] - mean
+                            m2 += d * d
+                    else:
+                        # Slide: x enters, the value w steps back leaves
+                        x_old = np.float64(arr[i - w, c])
+                        new_mean = mean + (x - x_old) / w
+                        m2 += (x - x_old) * (x - new_mean + x_old - mean)
+                        mean = new_mean
+
+                    lo = arr[min_q[min_head % (w + 1)], c]
+                    hi = arr[max_q[max_head % (w + 1)], c]
+                    out_mean[i, c, k] = mean
+                    out_min[i, c, k] = lo
+                    out_max[i, c, k] = hi
+                    if w < 2:
+                        out_std[i, c, k] = np.nan
+                    elif lo == hi:
+                        out_std[i, c, k] = 0.0
+                    else:
+                        out_std[i, c, k] = np.sqrt(max(m2, 0.0) / (w - 1))
+
+
+def _lags_numpy(arr: np.ndarray, lags: np.ndarray, out: np.ndarray) -> None:
+    """Slice-assignment fallback for compute_lags."""
+    n = len(arr)
+    out.fill(np.nan)
+    for k, lag in enumerate(lags):
+        if abs(lag) >= n:
+            continue  # shifted past the end: all NaN
+        if lag >= 0:
+            out[lag:, :, k] = arr[: n - lag]
+        else:
+            out[:lag, :, k] = arr[-lag:]
+
+
+def _move_stat(stat: str, arr: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing moving-window statistic down each column of a 2D array.
+
+    Matches pandas ``rolling(window).<stat>()``: NaN until a full window of
+    non-NaN values is available, and sample (ddof=1) standard deviation.
+    """
+    if window > len(arr) or (stat == "std" and window < 2):
+        # bottleneck rejects windows longer than the data (and its ddof=1 std
+        # of a single value is not reliably NaN); pandas gives all NaN
+        return np.full(arr.shape, np.nan)
+    if HAS_BOTTLENECK:
+        # One C-level sliding pass per statistic over all columns
+        if stat == "std":
+            return bn.move_std(arr, window, min_count=window, axis=0, ddof=1)
+        return getattr(bn, f"move_{stat}")(arr, window, min_count=window, axis=0)
+    return getattr(pd.DataFrame(arr).rolling(window), stat)().to_numpy()
+
+
+def compute_lags(arr: np.ndarray, lags: np.ndarray, out: np.ndarray) -> None:
+    """
+    Fill out[:, c, k] with column c of arr shifted by lags[k].
+
+    Args:
+        arr: [N, C] float32 or float64 input block
+        lags: int64 lag per output slice (negative lags lead)
+        out: [N, C, L] output of arr's dtype, NaN where the shift runs off the end
+    """
+    if HAS_NUMBA:
+        _compiled(_lags_loop, _LAG_SIGNATURE, arr.dtype)(arr, lags, out)
+    else:
+        _lags_numpy(arr, lags, out)
+
+
+def compute_rolling(
+    arr: np.ndarray,
+    windows: np.ndarray,
+    out_mean: np.ndarray,
+    out_std: np.ndarray,
+    out_min: np.ndarray,
+    out_max: np.ndarray,
+) -> None:
+    """
+    Fill [N, C, W] outputs with trailing rolling statistics of arr.
+
+    Matches pandas ``rolling(window)``: NaN until a full window of finite
+    values, sample (ddof=1) standard deviation, and exactly 0 std on
+    constant windows.
+    """
+    if HAS_NUMBA:
+        kernel = _compiled(_rolling_loop, _ROLLING_SIGNATURE, arr.dtype)
+        kernel(arr, windows, out_mean, out_std, out_min, out_max)
+        return
+
+    if np.isinf(arr).any():
+        # pandas rolling treats inf as missing; bottleneck would propagate it
+        arr = np.where(np.isinf(arr), np.nan, arr)
+    for k, window in enumerate(windows):
+        out_mean[:, :, k] = _move_stat("mean", arr, window)
+        out_std[:, :, k] = _move_stat("std", arr, window)
+        out_min[:, :, k] = _move_stat("min", arr, window)
+        out_max[:, :, k] = _move_stat("max", arr, window)
+    # Running-sum std leaves ~1e-8 residue on constant windows; pin to 0
+    # like pandas does
+    out_std[(out_min == out_max) & ~np.isnan(out_std)] = 0.0
@@ -5,12 +5,17 @@ Fetches time-series metrics from GCP Cloud Monitoring API for ML training.
 """
 
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from itertools import repeat
+from typing import TYPE_CHECKING, Optional
 
 import numpy as np
 import pandas as pd
-from google.cloud import monitoring_v3
+
+if TYPE_CHECKING:
+    from google.cloud import monitoring_v3
 
 sys.path.append("..")
 from config import config
@@ -35,6 +40,47 @@ METRIC_ALIGNERS = {
 }
 
 
+# One MetricServiceClient (and its gRPC channel) per process, shared by every
+# fetcher so repeated fetches skip channel setup and TLS handshakes
+_client = None
+_client_lock = threading.Lock()
+
+
+def _get_client():
+    """Return the process-wide MetricServiceClient, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # Imported lazily: the client library is slow to import
+                from google.cloud import monitoring_v3
+
+                _client = monitoring_v3.MetricServiceClient()
+    return _client
+
+
+def _list_time_series_retry():
+    """Exponential backoff on transient gRPC errors for list_time_series."""
+    from google.api_core.retry import Retry
+
+    return Retry(initial=0.1, maximum=2.0, multiplier=2.0, timeout=30.0)
+
+
+def _outer_join_on_timestamp(frames: list) -> pd.DataFrame:
+    """
+    Outer-join timestamp-indexed frames/series in one pass.
+
+    A single pd.concat aligns every frame against the union of timestamps,
+    instead of re-sorting and re-hashing on each pairwise merge.
+    """
+    result = pd.concat(frames, axis=1, join="outer")
+    # Inputs are ascending; only a union of mismatched timestamps can reorder
+    if not result.index.is_monotonic_increasing:
+        result = result.sort_index()
+    result.index.name = "timestamp"
+    return result.reset_index()
+
+
 class CloudMonitoringFetcher:
     """
     Fetches metrics from GCP Cloud Monitoring.
@@ -54,27 +100,22 @@ class CloudMonitoringFetcher:
             project_id: GCP project ID. Defaults to config value.
         """
         self.project_id = project_id or config.gcp.project_id
-        self.client = monitoring_v3.MetricServiceClient()
+        self.client = _get_client()
         self.project_name = f"projects/{self.project_id}"
 
-    def _get_aligner(self, metric_type: str) -> monitoring_v3.Aggregation.Aligner:
+    def _get_aligner(self, metric_type: str) -> "monitoring_v3.Aggregation.Aligner":
         """Get the appropriate aligner for a metric type."""
+        from google.cloud import monitoring_v3
+
         aligner_name = METRIC_ALIGNERS.get(metric_type, "ALIGN_MEAN")
         return getattr(monitoring_v3.Aggregation.Aligner, aligner_name)
 
-    def _timestamp_to_datetime(self, ts) -> datetime:
-        """Convert protobuf timestamp or DatetimeWithNanoseconds to datetime."""
-        try:
-            # If it has a replace method, it's datetime-like
-            if hasattr(ts, "replace"):
-                return ts.replace(tzinfo=None)
-            # If it has seconds attribute, convert from epoch
-            elif hasattr(ts, "seconds"):
-                return datetime.utcfromtimestamp(ts.seconds)
-            else:
-                return ts
-        except Exception:
-            return datetime.utcnow()
+    def _timestamp_to_seconds(self, ts) -> float:
+        """Convert protobuf timestamp or DatetimeWithNanoseconds to epoch seconds."""
+        # DatetimeWithNanoseconds is timezone-aware (UTC)
+        if hasattr(ts, "timestamp"):
+            return ts.timestamp()
+        return ts.seconds + ts.nanos / 1e9
 
     def fetch_metric(
         self,
@@ -83,6 +124,7 @@ class CloudMonitoringFetcher:
         aggregation_minutes: int = 5,
         filters: Optional[dict[str, str]] = None,
         end_time: Optional[datetime] = None,
+        reduce_mean: bool = False,
     ) -> pd.DataFrame:
         """
         Fetch a single metric type as a DataFrame.
@@ -93,10 +135,16 @@ class CloudMonitoringFetcher:
             aggregation_minutes: Aggregation window in minutes
             filters: Additional metric filters (e.g., {"resource.labels.namespace_name": "saleor"})
             end_time: End time for the query. Defaults to now.
+            reduce_mean: Average across all series server-side, returning a
+                single series (one value per timestamp, no label columns)
 
         Returns:
             DataFrame with columns: timestamp, value, and any label columns
         """
+        from google.api_core import exceptions as api_exceptions
+        from google.auth import exceptions as auth_exceptions
+        from google.cloud import monitoring_v3
+
         now = datetime.utcnow()
         end_time = end_time or now
         start_time = end_time - timedelta(hours=hours)
@@ -122,6 +170,10 @@ class CloudMonitoringFetcher:
             alignment_period={"seconds": aggregation_minutes * 60},
             per_series_aligner=aligner,
         )
+        if reduce_mean:
+            # Let Cloud Monitoring average across series instead of pandas
+            aggregation.cross_series_reducer = monitoring_v3.Aggregation.Reducer.REDUCE_MEAN
+            aggregation.group_by_fields = []
 
         # Make the request
         request = monitoring_v3.ListTimeSeriesRequest(
@@ -132,51 +184,133 @@ class CloudMonitoringFetcher:
             view=monitoring_v3.ListTimeSeriesRequest.TimeSeriesView.FULL,
         )
 
-        # Parse results into DataFrame
-        records = []
+        # Parse results page by page into preallocated arrays; one DataFrame
+        # is built at the end
+        timestamp_chunks: list[np.ndarray] = []
+        value_chunks: list[np.ndarray] = []
+        label_cols: dict[str, list] = {}
+        n_total = 0
+        n_series = 0
         try:
-            results = self.client.list_time_series(request=request)
-            for ts in results:
-                labels = dict(ts.metric.labels)
-                labels.update({f"resource_{k}": v for k, v in ts.resource.labels.items()})
-
-                for point in ts.points:
-                    timestamp = self._timestamp_to_datetime(point.interval.end_time)
-                    record = {
-                        "timestamp": timestamp,
-                        "value": self._extract_value(point.value),
-                        "metric_type": metric_type,
-                        **labels,
+            # Transient errors are retried with backoff; later pages reuse the retry
+            pager = self.client.list_time_series(
+                request=request, retry=_list_time_series_retry()
+            )
+            for page in pager.pages:
+                # Each page's size is known up front, so no list growth per point
+                n_page = sum(len(ts.points) for ts in page.time_series)
+                page_timestamps = np.empty(n_page, dtype=np.float64)
+                page_values = np.empty(n_page, dtype=np.float64)
+
+                i = 0
+                for ts in page.time_series:
+                    series_labels = {
+                        **ts.metric.labels,
+                        **{f"resource_{k}": v for k, v in ts.resource.labels.items()},
                     }
-                    records.append(record)
-        except Exception as e:
+
+                    n_before = n_total + i
+                    n_points = len(ts.points)
+                    n_series += 1
+
+                    # Points arrive newest first; fill backwards so each series
+                    # lands in ascending time order without a later sort
+                    j = i + n_points
+                    for point in ts.points:
+                        j -= 1
+                        page_timestamps[j] = self._timestamp_to_seconds(point.interval.end_time)
+                        page_values[j] = self._extract_value(point.value)
+                    i += n_points
+
+                    # Labels are constant per series: extend each column once per
+                    # series, padding columns this series lacks
+                    for key, value in series_labels.items():
+                        label_cols.setdefault(key, [None] * n_before).extend(
+                            repeat(value, n_points)
+                        )
+                    for key in label_cols.keys() - series_labels.keys():
+                        label_cols[key].extend(repeat(None, n_points))
+
+                timestamp_chunks.append(page_timestamps)
+                value_chunks.append(page_values)
+                n_total += n_page
+        except (
+            api_exceptions.GoogleAPICallError,
+            api_exceptions.RetryError,
+            auth_exceptions.GoogleAuthError,
+            ValueError,
+        ) as e:
+            # Non-retryable API errors, retries exhausted, credential/transport
+            # failures or an unparseable point: return no data so callers can
+            # fall back (e.g. to CSV) instead of aborting the whole fetch
             print(f"Warning: Failed to fetch {metric_type}: {e}")
             return pd.DataFrame()
 
-        if not records:
+        if n_total == 0:
             return pd.DataFrame()
 
-        df = pd.DataFrame(records)
-        df = df.sort_values("timestamp").reset_index(drop=True)
+        # Single-page responses (the common case) are wrapped without a copy
+        timestamps = (
+            timestamp_chunks[0] if len(timestamp_chunks) == 1 else np.concatenate(timestamp_chunks)
+        )
+        values = value_chunks[0] if len(value_chunks) == 1 else np.concatenate(value_chunks)
+
+        df = pd.DataFrame(
+            {
+                "timestamp": pd.to_datetime(timestamps, unit="s"),
+                "value": values,
+                "metric_type": metric_type,
+                **label_cols,
+            },
+            copy=False,
+        )
+        if n_series > 1 or not df["timestamp"].is_monotonic_increasing:
+            # Interleave the already-ascending series; stable sort keeps series
+            # order. A single series split across pages also arrives with the
+            # pages newest first, so it is sorted too
+            df = df.sort_values("timestamp", kind="stable").reset_index(drop=True)
         return df
 
     def _extract_value(self, typed_value) -> float:
         """Extract numeric value from TypedValue."""
-        # Try different value fields (proto3 doesn't have HasField for scalars)
-        try:
+        # Dispatch on the populated oneof field (proto3 scalars default to 0)
+        kind = type(typed_value).pb(typed_value).WhichOneof("value")
+        if kind == "double_value":
             return typed_value.double_value
-        except:
-            pass
-        try:
+        elif kind == "int64_value":
             return float(typed_value.int64_value)
-        except:
-            pass
-        try:
+        elif kind == "distribution_value":
             return typed_value.distribution_value.mean
-        except:
-            pass
         return 0.0
 
+    def _fetch_parallel(
+        self,
+        metrics_to_fetch: list[tuple[str, str]],
+        hours: int,
+        filters: Optional[dict[str, str]] = None,
+    ) -> list[tuple[str, pd.DataFrame]]:
+        """
+        Fetch several metrics concurrently, each reduced to its mean across series.
+
+        Each ListTimeSeries call is network-bound (grpc releases the GIL), so
+        the group costs roughly the slowest RPC instead of the sum of all of them.
+        The shared MetricServiceClient is thread-safe.
+
+        Returns:
+            List of (column name, DataFrame) in the order of metrics_to_fetch
+        """
+        if not metrics_to_fetch:
+            return []
+
+        def fetch(item: tuple[str, str]) -> tuple[str, pd.DataFrame]:
+            metric, name = item
+            return name, self.fetch_metric(
+                metric, hours=hours, filters=filters, reduce_mean=True
+            )
+
+        with ThreadPoolExecutor(max_workers=len(metrics_to_fetch)) as executor:
+            return list(executor.map(fetch, metrics_to_fetch))
+
     def fetch_container_metrics(
         self,
         namespace: str = "saleor",
@@ -197,23 +331,16 @@ class CloudMonitoringFetcher:
         ]
 
         dfs = []
-        for metric, name in metrics_to_fetch:
-            df = self.fetch_metric(metric, hours=hours, filters=filters)
+        for name, df in self._fetch_parallel(metrics_to_fetch, hours, filters):
             if not df.empty:
-                # Aggregate across containers (take mean per timestamp)
-                df_agg = df.groupby("timestamp")["value"].mean().reset_index()
-                df_agg = df_agg.rename(columns={"value": name})
-                dfs.append(df_agg)
+                # Already averaged across containers server-side
+                dfs.append(df.set_index("timestamp")["value"].rename(name))
 
         if not dfs:
             return pd.DataFrame()
 
         # Merge on timestamp
-        result = dfs[0]
-        for df in dfs[1:]:
-            result = pd.merge(result, df, on="timestamp", how="outer")
-
-        return result.sort_values("timestamp").reset_index(drop=True)
+        return _outer_join_on_timestamp(dfs)
 
     def fetch_locust_metrics(self, hours: int = 6) -> pd.DataFrame:
         """
@@ -229,21 +356,14 @@ class CloudMonitoringFetcher:
         ]
 
         dfs = []
-        for metric, name in prometheus_metrics:
-            df = self.fetch_metric(metric, hours=hours)
+        for name, df in self._fetch_parallel(prometheus_metrics, hours):
             if not df.empty:
-                df_agg = df.groupby("timestamp")["value"].mean().reset_index()
-                df_agg = df_agg.rename(columns={"value": name})
-                dfs.append(df_agg)
+                dfs.append(df.set_index("timestamp")["value"].rename(name))
 
         if not dfs:
             return pd.DataFrame()
 
-        result = dfs[0]
-        for df in dfs[1:]:
-            result = pd.merge(result, df, on="timestamp", how="outer")
-
-        return result.sort_values("timestamp").reset_index(drop=True)
+        return _outer_join_on_timestamp(dfs)
 
     def fetch_cloudsql_metrics(self, hours: int = 6) -> pd.DataFrame:
         """Fetch Cloud SQL database metrics."""
@@ -254,21 +374,14 @@ class CloudMonitoringFetcher:
         ]
 
         dfs = []
-        for metric, name in metrics_to_fetch:
-            df = self.fetch_metric(metric, hours=hours)
+        for name, df in self._fetch_parallel(metrics_to_fetch, hours):
             if not df.empty:
-                df_agg = df.groupby("timestamp")["value"].mean().reset_index()
-                df_agg = df_agg.rename(columns={"value": name})
-                dfs.append(df_agg)
+                dfs.append(df.set_index("timestamp")["value"].rename(name))
 
         if not dfs:
             return pd.DataFrame()
 
-        result = dfs[0]
-        for df in dfs[1:]:
-            result = pd.merge(result, df, on="timestamp", how="outer")
-
-        return result.sort_values("timestamp").reset_index(drop=True)
+        return _outer_join_on_timestamp(dfs)
 
     def fetch_all_metrics(self, hours: int = 6, namespace: str = "saleor") -> pd.DataFrame:
         """
@@ -283,17 +396,15 @@ class CloudMonitoringFetcher:
         locust_df = self.fetch_locust_metrics(hours)
         db_df = self.fetch_cloudsql_metrics(hours)
 
-        # Round timestamps to nearest minute for better merging
+        # Round timestamps down to 5-minute buckets for better merging.
+        # Returns frames indexed by timestamp, ready for the final concat.
         def round_timestamps(df):
             if df.empty or "timestamp" not in df.columns:
                 return df
-            df = df.copy()
-            df["timestamp"] = pd.to_datetime(df["timestamp"]).dt.floor("5min")
-            # Aggregate if multiple rows per rounded timestamp
-            numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-            if numeric_cols:
-                df = df.groupby("timestamp")[numeric_cols].mean().reset_index()
-            return df
+            df = df.set_index(pd.to_datetime(df["timestamp"])).drop(columns="timestamp")
+            # Aggregate if multiple rows per rounded timestamp; drop empty buckets
+            df = df.select_dtypes(include=[np.number]).resample("5min").mean()
+            return df.dropna(how="all")
 
         container_df = round_timestamps(container_df)
         locust_df = round_timestamps(locust_df)
@@ -315,14 +426,8 @@ class CloudMonitoringFetcher:
             print("Warning: No metrics found from Cloud Monitoring")
             return pd.DataFrame()
 
-        # Start with first dataframe
-        result = all_dfs[0][1].copy()
-
-        # Merge remaining dataframes
-        for name, df in all_dfs[1:]:
-            result = pd.merge(result, df, on="timestamp", how="outer")
-
-        result = result.sort_values("timestamp").reset_index(drop=True)
+        # Align all categories on timestamp in a single outer concat
+        result = _outer_join_on_timestamp([df for _, df in all_dfs])
         print(f"Fetched {len(result)} data points with {len(result.columns)} features")
 
         return result
@@ -4,11 +4,77 @@ Feature Engineering for Time Series
 Transforms raw metrics into ML-ready features with temporal patterns.
 """
 
+import math
 from typing import Optional
 
 import numpy as np
 import pandas as pd
 
+from ._kernels import compute_lags, compute_rolling
+
+
+def _append_columns(df: pd.DataFrame, *blocks: pd.DataFrame) -> pd.DataFrame:
+    """
+    Append blocks of new feature columns to df in a single concat.
+
+    Existing columns with the same names are replaced, as column
+    assignment would.
+    """
+    new_columns = pd.Index([c for block in blocks for c in block.columns])
+    overlap = df.columns.intersection(new_columns)
+    if len(overlap):
+        df = df.drop(columns=overlap)
+    return pd.concat([df, *blocks], axis=1, copy=False)
+
+
+def _to_datetime(ts: pd.Series) -> pd.Series:
+    """Parse a timestamp column unless it already has a datetime dtype."""
+    if pd.api.types.is_datetime64_any_dtype(ts):
+        return ts
+    return pd.to_datetime(ts)
+
+
+def _shift(arr: np.ndarray, period: int) -> np.ndarray:
+    """Float array shifted down axis 0 by period (negative shifts up), NaN-filled."""
+    n = len(arr)
+    shifted = np.full_like(arr, np.nan)
+    if abs(period) < n:
+        if period >= 0:
+            shifted[period:] = arr[: n - period]
+        else:
+            shifted[:period] = arr[-period:]
+    return shifted
+
+
+def _column_block(df: pd.DataFrame, columns: list[str], dtype: np.dtype) -> np.ndarray:
+    """Numeric columns as one [N, C] float array in column-major (F) order."""
+    return np.asfortranarray(df[columns].to_numpy(dtype=dtype))
+
+
+def _feature_block(n: int, *shape: int, dtype: np.dtype) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Allocate an output block for n rows of features indexed by shape.
+
+    Returns (out, block):
+        out: [n, *shape] view for the kernels, stride-1 along rows
+        block: [n, prod(shape)] F-ordered 2D view of the same memory, columns
+            in C order over shape (i.e. the feature naming order)
+    """
+    base = np.empty((*shape, n), dtype=dtype)
+    out = np.moveaxis(base, -1, 0)
+    block = base.reshape(math.prod(shape), n).T
+    return out, block
+
+
+def _frame(df: pd.DataFrame, block: np.ndarray, names: list[str]) -> pd.DataFrame:
+    """
+    Wrap a 2D feature block as a DataFrame on df's index.
+
+    The F-ordered block transposes to pandas' C-ordered [columns, rows]
+    layout, so it becomes a single block without a copy.
+    """
+    return pd.DataFrame(block, index=df.index, columns=names, copy=False)
+
 
 class FeatureEngineer:
     """
@@ -19,12 +85,18 @@ class FeatureEngineer:
     - Rolling statistics (mean, std, min, max)
     - Time-based features (hour, day_of_week, is_weekend)
     - Rate of change features
+
+    Layout: numeric inputs and generated feature blocks are kept column-major
+    (Fortran order), so every per-column pass (shift, rolling window) streams
+    contiguous memory and the blocks enter pandas without a re-stride.
     """
 
     def __init__(
         self,
         lag_periods: list[int] = [1, 2, 3, 6, 12],
         rolling_windows: list[int] = [3, 6, 12],
+        dtype: type = np.float32,
+        raw_time_features: bool = True,
     ):
         """
         Initialize feature engineer.
@@ -32,45 +104,77 @@ class FeatureEngineer:
         Args:
             lag_periods: Lag periods to create (in data intervals)
             rolling_windows: Rolling window sizes for statistics
+            dtype: Float dtype of generated lag/rolling/rate/cyclical features.
+                float32 halves their memory and bandwidth; models train on
+                float32 anyway
+            raw_time_features: Also emit the raw hour, day_of_week and
+                minute_of_day columns alongside their cyclical encodings
         """
         self.lag_periods = lag_periods
         self.rolling_windows = rolling_windows
+        self.dtype = np.dtype(dtype)
+        self.raw_time_features = raw_time_features
 
     def add_time_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Add time-based features.
 
         Args:
-            df: DataFrame with 'timestamp' column
+            df: DataFrame with 'timestamp' column, or indexed by a DatetimeIndex
 
         Returns:
             DataFrame with added time features
         """
-        df = df.copy()
-
-        if "timestamp" not in df.columns:
-            raise ValueError("DataFrame must have 'timestamp' column")
-
-        ts = pd.to_datetime(df["timestamp"])
-
-        # Hour of day (cyclical encoding)
-        df["hour"] = ts.dt.hour
-        df["hour_sin"] = np.sin(2 * np.pi * df["hour"] / 24)
-        df["hour_cos"] = np.cos(2 * np.pi * df["hour"] / 24)
-
-        # Day of week (cyclical encoding)
-        df["day_of_week"] = ts.dt.dayofweek
-        df["dow_sin"] = np.sin(2 * np.pi * df["day_of_week"] / 7)
-        df["dow_cos"] = np.cos(2 * np.pi * df["day_of_week"] / 7)
-
-        # Binary features
-        df["is_weekend"] = (df["day_of_week"] >= 5).astype(int)
-        df["is_business_hours"] = ((df["hour"] >= 9) & (df["hour"] <= 17)).astype(int)
-
-        # Minute of day (for finer granularity)
-        df["minute_of_day"] = ts.dt.hour * 60 + ts.dt.minute
-
-        return df
+        return _append_columns(df.copy(), self._time_block(df))
+
+    def _time_block(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Time features of df as a DataFrame of only the new columns."""
+        if "timestamp" in df.columns:
+            ts = pd.DatetimeIndex(_to_datetime(df["timestamp"]))
+        elif isinstance(df.index, pd.DatetimeIndex):
+            # Already-parsed time index: use it as is
+            ts = df.index
+        else:
+            raise ValueError("DataFrame must have 'timestamp' column or a DatetimeIndex")
+        if ts.tz is not None:
+            # Features describe local wall-clock time, as the .dt accessors do
+            ts = ts.tz_localize(None)
+
+        # Everything derives from one pass over int64 nanoseconds since epoch
+        values = ts.to_numpy(dtype="datetime64[ns]")
+        sec = values.view("i8") // 1_000_000_000
+        minute_of_day = ((sec // 60) % 1440).astype(np.int32)
+        hour = minute_of_day // 60
+        day_of_week = ((sec // 86400 + 3) % 7).astype(np.int32)  # 1970-01-01 was a Thursday
+
+        nat = np.isnat(values)
+        if nat.any():
+            # Missing timestamps give NaN features, as the .dt accessors do
+            minute_of_day = np.where(nat, np.nan, minute_of_day)
+            hour = np.where(nat, np.nan, hour)
+            day_of_week = np.where(nat, np.nan, day_of_week)
+
+        # Cyclical encodings: angles computed once, shared by sin and cos
+        theta_hour = (2 * np.pi * hour / 24).astype(self.dtype)
+        theta_dow = (2 * np.pi * day_of_week / 7).astype(self.dtype)
+
+        time_cols = {
+            "hour": hour,
+            "hour_sin": np.sin(theta_hour),
+            "hour_cos": np.cos(theta_hour),
+            "day_of_week": day_of_week,
+            "dow_sin": np.sin(theta_dow),
+            "dow_cos": np.cos(theta_dow),
+            # 0/1 flags as int8: 1 byte per row instead of 8
+            "is_weekend": (day_of_week >= 5).astype(np.int8),
+            "is_business_hours": ((hour >= 9) & (hour <= 17)).astype(np.int8),
+            "minute_of_day": minute_of_day,
+        }
+        if not self.raw_time_features:
+            # Raw integers stay local, used only for the encodings and flags
+            for name in ("hour", "day_of_week", "minute_of_day"):
+                del time_cols[name]
+        return pd.DataFrame(time_cols, index=df.index)
 
     def add_lag_features(
         self,
@@ -89,16 +193,39 @@ class FeatureEngineer:
         Returns:
             DataFrame with lag features
         """
-        df = df.copy()
-        lag_periods = lag_periods or self.lag_periods
+        return _append_columns(df.copy(), self._lag_block(df, columns, lag_periods))
 
-        for col in columns:
-            if col not in df.columns:
-                continue
-            for lag in lag_periods:
-                df[f"{col}_lag_{lag}"] = df[col].shift(lag)
+    def _lag_block(
+        self,
+        df: pd.DataFrame,
+        columns: list[str],
+        lag_periods: Optional[list[int]] = None,
+        values: Optional[np.ndarray] = None,
+    ) -> pd.DataFrame:
+        """
+        Lag features of df as a DataFrame of only the new columns.
 
-        return df
+        values may pass in the precomputed _column_block(df, columns).
+        """
+        lag_periods = lag_periods or self.lag_periods
+        columns = [c for c in columns if c in df.columns]
+        if not columns:
+            return pd.DataFrame(index=df.index)
+        if values is None:
+            values = _column_block(df, columns, self.dtype)
+
+        # Shift every column by every lag into one [N, C, L] block instead of
+        # C*L separate columns
+        n = len(df)
+        lagged, block = _feature_block(n, len(columns), len(lag_periods), dtype=self.dtype)
+        if all(abs(lag) >= n for lag in lag_periods):
+            # Every lag runs off the end of a frame this short: all NaN
+            block.fill(np.nan)
+        else:
+            compute_lags(values, np.asarray(lag_periods, dtype=np.int64), lagged)
+
+        names = [f"{col}_lag_{lag}" for col in columns for lag in lag_periods]
+        return _frame(df, block, names)
 
     def add_rolling_features(
         self,
@@ -117,19 +244,51 @@ class FeatureEngineer:
         Returns:
             DataFrame with rolling features
         """
-        df = df.copy()
-        windows = windows or self.rolling_windows
+        return _append_columns(df.copy(), self._rolling_block(df, columns, windows))
 
-        for col in columns:
-            if col not in df.columns:
-                continue
-            for window in windows:
-                df[f"{col}_roll_mean_{window}"] = df[col].rolling(window).mean()
-                df[f"{col}_roll_std_{window}"] = df[col].rolling(window).std()
-                df[f"{col}_roll_min_{window}"] = df[col].rolling(window).min()
-                df[f"{col}_roll_max_{window}"] = df[col].rolling(window).max()
+    def _rolling_block(
+        self,
+        df: pd.DataFrame,
+        columns: list[str],
+        windows: Optional[list[int]] = None,
+        values: Optional[np.ndarray] = None,
+    ) -> pd.DataFrame:
+        """
+        Rolling features of df as a DataFrame of only the new columns.
 
-        return df
+        values may pass in the precomputed _column_block(df, columns).
+        """
+        windows = windows or self.rolling_windows
+        columns = [c for c in columns if c in df.columns]
+        if not columns:
+            return pd.DataFrame(index=df.index)
+        if values is None:
+            values = _column_block(df, columns, self.dtype)
+
+        # All columns are processed together as one [N, C] block; results land
+        # in one [N, C, W, 4] block
+        n = len(df)
+        stats, block = _feature_block(n, len(columns), len(windows), 4, dtype=self.dtype)
+        if n < min(windows):
+            # No window fills on a frame this short: every statistic is NaN
+            block.fill(np.nan)
+        else:
+            compute_rolling(
+                values,
+                np.asarray(windows, dtype=np.int64),
+                stats[..., 0],
+                stats[..., 1],
+                stats[..., 2],
+                stats[..., 3],
+            )
+
+        names = [
+            f"{col}_roll_{stat}_{window}"
+            for col in columns
+            for window in windows
+            for stat in ("mean", "std", "min", "max")
+        ]
+        return _frame(df, block, names)
 
     def add_rate_of_change(
         self,
@@ -148,16 +307,48 @@ class FeatureEngineer:
         Returns:
             DataFrame with rate of change features
         """
-        df = df.copy()
+        return _append_columns(df.copy(), self._rate_of_change_block(df, columns, periods))
 
-        for col in columns:
-            if col not in df.columns:
-                continue
-            for period in periods:
-                df[f"{col}_pct_change_{period}"] = df[col].pct_change(period)
-                df[f"{col}_diff_{period}"] = df[col].diff(period)
+    def _rate_of_change_block(
+        self,
+        df: pd.DataFrame,
+        columns: list[str],
+        periods: list[int] = [1, 3, 6],
+        values: Optional[np.ndarray] = None,
+    ) -> pd.DataFrame:
+        """
+        Rate of change features of df as a DataFrame of only the new columns.
 
-        return df
+        values may pass in the precomputed _column_block(df, columns).
+        """
+        columns = [c for c in columns if c in df.columns]
+        if not columns:
+            return pd.DataFrame(index=df.index)
+        if values is None:
+            values = _column_block(df, columns, self.dtype)
+
+        # Each period is one shift of the whole [N, C] block, shared by diff
+        # and pct_change and written straight into the [N, C, P, 2] output
+        n = len(df)
+        roc, block = _feature_block(n, len(columns), len(periods), 2, dtype=self.dtype)
+        for k, period in enumerate(periods):
+            if abs(period) >= n:
+                # No earlier value to compare against: all NaN
+                roc[:, :, k].fill(np.nan)
+                continue
+            shifted = _shift(values, period)
+            diff = np.subtract(values, shifted, out=roc[:, :, k, 1])
+            # /0 gives inf/nan as in pandas
+            with np.errstate(divide="ignore", invalid="ignore"):
+                np.divide(diff, shifted, out=roc[:, :, k, 0])
+
+        names = [
+            f"{col}_{kind}_{period}"
+            for col in columns
+            for period in periods
+            for kind in ("pct_change", "diff")
+        ]
+        return _frame(df, block, names)
 
     def transform(
         self,
@@ -172,28 +363,47 @@ class FeatureEngineer:
             target_columns: Columns to create features for. If None, uses all numeric columns.
 
         Returns:
-            Feature-engineered DataFrame
+            Feature-engineered DataFrame. Its input columns share memory with
+            df (no deep copy is made), so do not modify them in place on
+            either frame; the new feature columns are independent.
         """
-        df = df.copy()
+        # One shallow copy for the whole pipeline: every step only adds new
+        # columns and the caller's frame keeps its own column set. The input
+        # columns' data is shared, not copied: writing to them through the
+        # result writes to the caller's frame too
+        df = df.copy(deep=False)
 
         # Determine target columns
         if target_columns is None:
             target_columns = df.select_dtypes(include=[np.number]).columns.tolist()
             target_columns = [c for c in target_columns if c != "timestamp"]
 
+        if "timestamp" in df.columns:
+            # Parse once and store back, so no later step (or caller) re-parses
+            df["timestamp"] = _to_datetime(df["timestamp"])
+
+        # Each step builds only its new columns; they are joined to the
+        # input with one concat at the end
+        blocks = []
+
         # Add time features
-        df = self.add_time_features(df)
+        blocks.append(self._time_block(df))
+
+        # Lag, rolling and rate-of-change share one column-major block of the
+        # targets; each lag/window/period handles all columns at once
+        target_columns = [c for c in target_columns if c in df.columns]
+        values = _column_block(df, target_columns, self.dtype)
 
         # Add lag features
-        df = self.add_lag_features(df, target_columns)
+        blocks.append(self._lag_block(df, target_columns, values=values))
 
         # Add rolling features
-        df = self.add_rolling_features(df, target_columns)
+        blocks.append(self._rolling_block(df, target_columns, values=values))
 
         # Add rate of change features
-        df = self.add_rate_of_change(df, target_columns)
+        blocks.append(self._rate_of_change_block(df, target_columns, values=values))
 
-        return df
+        return _append_columns(df, *blocks)
 
     def prepare_for_training(
         self,
@@ -228,10 +438,12 @@ class FeatureEngineer:
         X = X.select_dtypes(include=[np.number])
 
         if drop_na:
-            # Find valid indices (no NaN in either X or y)
-            valid_idx = X.dropna().index.intersection(y.dropna().index)
-            X = X.loc[valid_idx]
-            y = y.loc[valid_idx]
+            # Keep rows with no NaN in either X or y: one boolean mask over the
+            # numeric block (na_value covers nullable dtypes)
+            values = X.to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~(np.isnan(values).any(axis=1) | y.isna().to_numpy())
+            X = X.iloc[valid]
+            y = y.iloc[valid]
 
         return X, y
 
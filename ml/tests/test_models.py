@@ -328,6 +328,253 @@ class TestXGBoostAnomalyDetector:
         # feature_a should have highest importance (since y is mostly determined by it)
         assert result.feature_importance["feature_a"] > result.feature_importance["feature_c"]
 
+        # Each result owns its dict
+        result.feature_importance.clear()
+        assert "feature_a" in model.predict(X, y).feature_importance
+
+    def test_eval_stats_match_numpy(self):
+        """Test the evaluation kernel against the numpy path, incl. offset and NaN scores."""
+        from models.xgboost_anomaly import _eval_stats, _eval_stats_numpy
+
+        rng = np.random.default_rng(42)
+        offset = 1e4 + rng.random(10_000)
+        with_nan = rng.random(200)
+        with_nan[17] = np.nan
+
+        for scores, threshold in [(offset, 1e4 + 0.5), (with_nan, 0.5)]:
+            labels = rng.integers(0, 2, len(scores))
+            predictions, *stats = _eval_stats(scores, labels, threshold)
+            expected_predictions, *expected = _eval_stats_numpy(scores, labels, threshold)
+            np.testing.assert_array_equal(predictions, expected_predictions)
+            assert stats[:4] == expected[:4]
+            np.testing.assert_allclose(stats[4:], expected[4:], rtol=1e-12)
+
+    def test_concurrent_predict(self):
+        """Test that predict calls from several threads do not share buffers."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        from models.xgboost_anomaly import XGBoostAnomalyDetector
+        model = XGBoostAnomalyDetector(n_estimators=10)
+
+        np.random.seed(42)
+        n_samples = 2000
+
+        x = pd.DataFrame({
+            "cpu_usage": np.random.randn(n_samples) * 10 + 50,
+            "memory_usage": np.random.randn(n_samples) * 15 + 60,
+        })
+        y = pd.Series(0.5 * x["cpu_usage"] + np.random.randn(n_samples) * 2)
+        model.fit(x, y)
+
+        # Same-length slices at different offsets, so a shared buffer would
+        # silently score another thread's rows
+        slices = [slice(i % 4 * 10, n_samples - i % 4 * 10) for i in range(200)]
+        expected = {s.start: model.predict(x[s], y[s]).scores for s in slices}
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda s: (s.start, model.predict(x[s], y[s]).scores), slices))
+
+        for start, scores in results:
+            assert np.array_equal(scores, expected[start])
+
+    def test_predict_rejects_wrong_width(self):
+        """Test that predict raises on a feature matrix of the wrong width."""
+        from models.xgboost_anomaly import XGBoostAnomalyDetector
+        model = XGBoostAnomalyDetector(n_estimators=10)
+
+        np.random.seed(42)
+        x = pd.DataFrame({"a": np.random.randn(100), "b": np.random.randn(100)})
+        y = pd.Series(x["a"] + np.random.randn(100) * 0.1)
+        model.fit(x, y)
+
+        with pytest.raises(ValueError, match="features"):
+            model.predict(x[["a"]], y)
+
+    def test_saved_scaler_does_not_modify_input(self):
+        """Test that the fitted scaler transforms callers' arrays without writing to them."""
+        from models.xgboost_anomaly import XGBoostAnomalyDetector
+        model = XGBoostAnomalyDetector(n_estimators=10)
+
+        np.random.seed(42)
+        x = pd.DataFrame({"a": np.random.randn(100), "b": np.random.randn(100)})
+        y = pd.Series(x["a"] + np.random.randn(100) * 0.1)
+        model.fit(x, y)
+
+        features = x.to_numpy(dtype=np.float32)
+        original = features.copy()
+        model.scaler_.transform(features)
+        np.testing.assert_array_equal(features, original)
+
+    def test_predict_rejects_reordered_columns(self):
+        """Test that predict raises when columns differ from those seen in fit."""
+        from models.xgboost_anomaly import XGBoostAnomalyDetector
+        model = XGBoostAnomalyDetector(n_estimators=10)
+
+        np.random.seed(42)
+        x = pd.DataFrame({"a": np.random.randn(100), "b": np.random.randn(100)})
+        y = pd.Series(x["a"] + np.random.randn(100) * 0.1)
+        model.fit(x, y)
+
+        with pytest.raises(ValueError, match="order must match"):
+            model.predict(x[["b", "a"]], y)
+        with pytest.raises(ValueError, match="order must match"):
+            model.evaluate(x.rename(columns={"b": "c"}), y)
+
+    def test_unpickle_legacy_detector(self):
+        """Test that detectors pickled with an XGBRegressor still load and score."""
+        import pickle
+
+        import xgboost as xgb
+        from models.xgboost_anomaly import XGBoostAnomalyDetector
+        from sklearn.preprocessing import StandardScaler
+
+        np.random.seed(42)
+        x = pd.DataFrame({"a": np.random.randn(200), "b": np.random.randn(200)})
+        y = pd.Series(2 * x["a"] + np.random.randn(200) * 0.1)
+
+        # State as the detector used to pickle it: no sorted importances,
+        # an sklearn-wrapper model trained on float64 scaled features
+        scaler = StandardScaler()
+        x_scaled = scaler.fit_transform(x)
+        regressor = xgb.XGBRegressor(n_estimators=10, random_state=42)
+        regressor.fit(x_scaled, y)
+        state = {
+            "n_estimators": 10,
+            "max_depth": 6,
+            "learning_rate": 0.1,
+            "threshold_sigma": 2.5,
+            "contamination": 0.05,
+            "model_": regressor,
+            "scaler_": scaler,
+            "threshold_": 1.0,
+            "feature_names_": list(x.columns),
+            "is_fitted_": True,
+        }
+        model = XGBoostAnomalyDetector.__new__(XGBoostAnomalyDetector)
+        model.__setstate__(pickle.loads(pickle.dumps(state)))
+
+        result = model.predict(x, y)
+        expected = np.abs(y.to_numpy() - regressor.predict(x_scaled))
+        assert np.allclose(result.scores, expected, atol=1e-4)
+        assert next(iter(model.get_top_features(1))) == "a"
+
+    def test_batched_scorer(self):
+        """Test that batched single-row scoring matches predict."""
+        import asyncio
+
+        from models.xgboost_anomaly import BatchedAnomalyScorer, XGBoostAnomalyDetector
+        model = XGBoostAnomalyDetector(n_estimators=10)
+
+        np.random.seed(42)
+        n_samples = 100
+
+        x = pd.DataFrame({
+            "cpu_usage": np.random.randn(n_samples) * 10 + 50,
+            "memory_usage": np.random.randn(n_samples) * 15 + 60,
+        })
+        y = pd.Series(0.5 * x["cpu_usage"] + np.random.randn(n_samples) * 2)
+
+        model.fit(x, y)
+        expected = model.predict(x, y).scores
+
+        async def score_all():
+            scorer = BatchedAnomalyScorer(model, batch_size=16, timeout_ms=5.0)
+            scorer.start()
+            try:
+                return await asyncio.gather(
+                    *(scorer.score(x.values[i], y.iloc[i]) for i in range(n_samples))
+                )
+            finally:
+                scorer.stop()
+
+        scores = asyncio.run(score_all())
+
+        assert len(scores) == n_samples
+        assert np.allclose(scores, expected, atol=1e-4)
+
+    def test_batched_scorer_malformed_row(self):
+        """Test that a malformed row fails its batch without stopping the scorer."""
+        import asyncio
+
+        from models.xgboost_anomaly import BatchedAnomalyScorer, XGBoostAnomalyDetector
+        model = XGBoostAnomalyDetector(n_estimators=10)
+
+        np.random.seed(42)
+        x = pd.DataFrame({"a": np.random.randn(100), "b": np.random.randn(100)})
+        y = pd.Series(x["a"] + np.random.randn(100) * 0.1)
+        model.fit(x, y)
+        expected = model.predict(x, y).scores
+
+        async def score_rows():
+            scorer = BatchedAnomalyScorer(model, batch_size=16, timeout_ms=5.0)
+            try:
+                # The short row cannot be stacked with the good one
+                failed = await asyncio.wait_for(
+                    asyncio.gather(
+                        scorer.score(x.values[0], y.iloc[0]),
+                        scorer.score(np.zeros(1), 0.0),
+                        return_exceptions=True,
+                    ),
+                    5,
+                )
+                assert all(isinstance(r, ValueError) for r in failed)
+                # The worker survived the bad batch
+                return await asyncio.wait_for(scorer.score(x.values[0], y.iloc[0]), 5)
+            finally:
+                scorer.stop()
+
+        assert np.isclose(asyncio.run(score_rows()), expected[0], atol=1e-4)
+
+    def test_batched_scorer_stop_fails_pending(self):
+        """Test that stop() fails rows still waiting to be scored."""
+        import asyncio
+
+        from models.xgboost_anomaly import BatchedAnomalyScorer, XGBoostAnomalyDetector
+        model = XGBoostAnomalyDetector(n_estimators=10)
+
+        np.random.seed(42)
+        x = pd.DataFrame({"a": np.random.randn(100), "b": np.random.randn(100)})
+        y = pd.Series(x["a"] + np.random.randn(100) * 0.1)
+        model.fit(x, y)
+
+        async def stop_with_pending():
+            # Long timeout: the rows sit in a half-filled batch or the queue
+            scorer = BatchedAnomalyScorer(model, batch_size=64, timeout_ms=60_000)
+            tasks = [
+                asyncio.create_task(scorer.score(x.values[i], y.iloc[i])) for i in range(10)
+            ]
+            await asyncio.sleep(0.01)
+            scorer.stop()
+            return await asyncio.wait_for(
+                asyncio.gather(*tasks, return_exceptions=True), 5
+            )
+
+        results = asyncio.run(stop_with_pending())
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_batched_scorer_start_twice(self):
+        """Test that a second start() does not spawn another worker."""
+        import asyncio
+
+        from models.xgboost_anomaly import BatchedAnomalyScorer, XGBoostAnomalyDetector
+        model = XGBoostAnomalyDetector(n_estimators=10)
+
+        np.random.seed(42)
+        x = pd.DataFrame({"a": np.random.randn(100), "b": np.random.randn(100)})
+        y = pd.Series(x["a"] + np.random.randn(100) * 0.1)
+        model.fit(x, y)
+
+        async def start_twice():
+            scorer = BatchedAnomalyScorer(model)
+            scorer.start()
+            task = scorer._task
+            scorer.start()
+            same = scorer._task is task
+            scorer.stop()
+            await asyncio.sleep(0)
+            return same, task.cancelled()
+
+        assert asyncio.run(start_twice()) == (True, True)
+
 
 class TestTrainingPipeline:
     """Tests for the training pipeline."""
@@ -363,6 +610,72 @@ class TestFeatureEngineering:
         fe = FeatureEngineer()
         assert fe is not None
 
+    def test_lag_and_rolling_match_pandas(self):
+        """Test block lag/rolling features against per-column pandas ops."""
+        from pipeline.feature_engineering import FeatureEngineer
+
+        np.random.seed(42)
+        df = pd.DataFrame({
+            "cpu": np.random.randn(200).cumsum() + 50,
+            "replicas": np.random.randint(1, 4, 200).astype(float),
+        })
+        df.loc[[10, 11, 150], "cpu"] = np.nan
+
+        fe = FeatureEngineer(lag_periods=[1, 6], rolling_windows=[3, 12], dtype=np.float64)
+        cols = ["cpu", "replicas"]
+        result = fe.add_rolling_features(fe.add_lag_features(df, cols), cols)
+
+        for col in ["cpu", "replicas"]:
+            for lag in [1, 6]:
+                pd.testing.assert_series_equal(
+                    result[f"{col}_lag_{lag}"], df[col].shift(lag), check_names=False
+                )
+            for window in [3, 12]:
+                rolling = df[col].rolling(window)
+                for stat in ["mean", "std", "min", "max"]:
+                    pd.testing.assert_series_equal(
+                        result[f"{col}_roll_{stat}_{window}"],
+                        getattr(rolling, stat)(),
+                        check_names=False,
+                        rtol=1e-6,
+                    )
+
+    def test_short_frame_features_all_nan(self):
+        """Test frames shorter than every lag/window/period give NaN features."""
+        from pipeline.feature_engineering import FeatureEngineer
+
+        df = pd.DataFrame({
+            "timestamp": pd.date_range("2026-01-01", periods=2, freq="5min"),
+            "cpu": [50.0, 51.0],
+        })
+
+        fe = FeatureEngineer(lag_periods=[3, 6], rolling_windows=[3, 12])
+        result = fe.transform(df)
+
+        # Rate of change uses periods [1, 3, 6]; only period 1 fits in 2 rows
+        generated = result.filter(regex=r"_(lag_\d+|roll_.*|pct_change_[36]|diff_[36])$")
+        assert generated.shape == (2, 2 + 2 * 4 + 2 * 2)
+        assert generated.isna().all().all()
+        assert result["cpu_diff_1"].iloc[1] == 1.0
+
+    def test_time_features_from_datetime_index(self):
+        """Test time features read a DatetimeIndex when there is no timestamp column."""
+        from pipeline.feature_engineering import FeatureEngineer
+
+        df = pd.DataFrame({
+            "timestamp": pd.date_range("2026-01-02 16:00", periods=48, freq="30min"),
+            "cpu": np.arange(48.0),
+        })
+
+        fe = FeatureEngineer()
+        from_column = fe.add_time_features(df)
+        from_index = fe.add_time_features(df.set_index("timestamp"))
+
+        time_cols = [c for c in from_column.columns if c not in df.columns]
+        np.testing.assert_array_equal(
+            from_column[time_cols].to_numpy(), from_index[time_cols].to_numpy()
+        )
+
 
 # Fixtures for common test data
 @pytest.fixture
@@ -4,7 +4,11 @@ Prescale ML Training Pipeline
 Orchestrates data fetching, feature engineering, model training, and evaluation.
 """
 
+import hashlib
+import io
 import json
+import math
+import os
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -19,9 +23,118 @@ from config import config
 from models.baseline import BaselineModel
 from models.prophet_model import ProphetForecaster
 from models.xgboost_anomaly import XGBoostAnomalyDetector
+from pipeline import _kernels, feature_engineering
 from pipeline.data_fetcher import CloudMonitoringFetcher
 from pipeline.feature_engineering import FeatureEngineer
 
+# Optional: orjson for fast JSON artifacts (serialises numpy types natively)
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Optional: pyarrow for multithreaded CSV parsing and the Parquet feature cache
+try:
+    import pyarrow  # noqa: F401
+
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+# Fewest complete rows the anomaly detector trains on
+MIN_ANOMALY_ROWS = 50
+
+# Engineered-feature Parquet files kept in output_dir/feat_cache (most
+# recently used first)
+FEATURE_CACHE_ENTRIES = 4
+
+
+def _json_safe(obj):
+    """
+    obj with numpy values as Python ones and NaN/inf as None.
+
+    Matches what orjson writes (non-finite floats become null), which the
+    stdlib encoder cannot do: it never calls default() for floats.
+    """
+    if isinstance(obj, dict):
+        return {key: _json_safe(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_json_safe(value) for value in obj]
+    if isinstance(obj, np.ndarray):
+        return _json_safe(obj.tolist())
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, (float, np.floating)):
+        return float(obj) if math.isfinite(obj) else None
+    return obj
+
+
+def _write_json(path: Path, obj: dict) -> None:
+    """
+    Write obj to path as indented JSON, via orjson when installed.
+
+    Both paths write NaN/inf as null, so the file does not depend on which
+    one ran.
+    """
+    if HAS_ORJSON:
+        path.write_bytes(
+            orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        )
+    else:
+        with open(path, "w") as f:
+            json.dump(_json_safe(obj), f, indent=2, allow_nan=False)
+
+
+def _prune_feature_cache(cache_dir: Path, keep: int) -> None:
+    """Delete all but the keep most recently used feature cache files."""
+    entries = sorted(
+        cache_dir.glob("*.parquet"), key=lambda path: path.stat().st_mtime, reverse=True
+    )
+    for path in entries[keep:]:
+        path.unlink(missing_ok=True)
+
+
+def _read_csv(source, **kwargs) -> pd.DataFrame:
+    """pd.read_csv with the pyarrow engine when installed (numpy-backed result)."""
+    if not HAS_PYARROW:
+        return pd.read_csv(source, **kwargs)
+    df = pd.read_csv(source, engine="pyarrow", **kwargs)
+    for col in kwargs.get("parse_dates", []):
+        # pyarrow infers the coarsest exact unit; keep the C engine's ns
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.as_unit("ns")
+    return df
+
+
+def _tail_csv(path: Path, n_rows: int, chunk_size: int = 64 * 1024, **kwargs) -> pd.DataFrame:
+    """
+    Read the header and the last n_rows rows of a CSV file.
+
+    Reads backwards from the end in chunk_size blocks until enough line
+    breaks are found, so I/O is proportional to n_rows rather than the file
+    size. Assumes no quoted field spans lines. kwargs go to _read_csv.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        body_start = f.tell()
+        pos = f.seek(0, os.SEEK_END)
+        tail = b""
+        # n_rows + 1 line breaks guarantee n_rows complete lines after the
+        # (possibly partial) first one
+        while pos > body_start and tail.count(b"\n") <= n_rows:
+            step = min(chunk_size, pos - body_start)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+
+    lines = tail.splitlines(keepends=True)
+    if pos > body_start:
+        lines = lines[1:]  # starts mid-line
+    return _read_csv(io.BytesIO(header + b"".join(lines[-n_rows:])), **kwargs)
+
 
 class PrescaleTrainingPipeline:
     """
@@ -90,28 +203,31 @@ class PrescaleTrainingPipeline:
         # If no data from Cloud Monitoring, try loading from CSV
         if df.empty or len(df.columns) <= 1:
             print("No Cloud Monitoring data, attempting to load from CSV...")
-            df = self._load_from_csv()
+            # The CSV holds 5-minute points: keep the requested window plus the
+            # history the lag/rolling features need
+            engineer = self.feature_engineer
+            history = max(engineer.lag_periods + engineer.rolling_windows)
+            df = self._load_from_csv(max_rows=hours * 12 + history)
 
         self.data_ = df
         print(f"✓ Loaded {len(df)} records with {len(df.columns)} columns")
 
         return df
 
-    def _load_from_csv(self) -> pd.DataFrame:
-        """Load data from saved CSV files as fallback."""
+    def _load_from_csv(self, max_rows: Optional[int] = None) -> pd.DataFrame:
+        """
+        Load data from saved CSV files as fallback.
+
+        Args:
+            max_rows: Only read this many of the most recent rows (all if None)
+        """
         # First try the real metrics CSV
         real_data_path = Path("data/training_data_real.csv")
         if real_data_path.exists():
             print(f"Loading from {real_data_path}")
-            df = pd.read_csv(real_data_path, parse_dates=["timestamp"])
-            return df
-
-        # Try loadtest stats CSVs
-        csv_path = Path("../data/loadtest")
-        csv_files = list(csv_path.glob("*_stats.csv"))
-
-        if csv_files:
-            print(f"Found {len(csv_files)} CSV files, but format not compatible")
+            if max_rows is not None:
+                return _tail_csv(real_data_path, max_rows, parse_dates=["timestamp"])
+            return _read_csv(real_data_path, parse_dates=["timestamp"])
 
         # Generate synthetic data for testing
         print("No compatible data found, using synthetic data...")
@@ -178,13 +294,50 @@ class PrescaleTrainingPipeline:
         if not target_cols:
             target_cols = numeric_cols[:4]  # Use first 4 numeric columns
 
-        df_features = self.feature_engineer.transform(df, target_columns=target_cols)
+        cache_path = self._feature_cache_path(df, target_cols)
+        if cache_path is not None and cache_path.exists():
+            df_features = pd.read_parquet(cache_path)
+            cache_path.touch()  # mark as recently used
+            print(f"✓ Loaded cached features from {cache_path}")
+        else:
+            df_features = self.feature_engineer.transform(df, target_columns=target_cols)
+            if cache_path is not None:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                df_features.to_parquet(cache_path, compression="snappy")
+                _prune_feature_cache(cache_path.parent, FEATURE_CACHE_ENTRIES)
 
         print(f"✓ Generated {len(df_features.columns)} features from {len(df.columns)} columns")
         print(f"  New features: {len(df_features.columns) - len(df.columns)}")
 
         return df_features
 
+    def _feature_cache_path(self, df: pd.DataFrame, target_cols: list[str]) -> Optional[Path]:
+        """
+        Parquet cache file for the engineered features of df (None without pyarrow).
+
+        Keyed by a hash of the data (values, index, columns and dtypes), of
+        the feature settings and of the feature engineering source, so a
+        change to any of them misses the cache.
+        """
+        if not HAS_PYARROW:
+            return None
+        engineer = self.feature_engineer
+        settings = (
+            list(df.columns),
+            df.dtypes.astype(str).tolist(),
+            target_cols,
+            engineer.lag_periods,
+            engineer.rolling_windows,
+            str(engineer.dtype),
+            engineer.raw_time_features,
+        )
+        key = hashlib.blake2b(digest_size=8)
+        key.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+        key.update(repr(settings).encode())
+        for module in (feature_engineering, _kernels):
+            key.update(Path(module.__file__).read_bytes())
+        return self.output_dir / "feat_cache" / f"{key.hexdigest()}.parquet"
+
     def train_baseline(
         self,
         df: pd.DataFrame,
@@ -304,21 +457,24 @@ class PrescaleTrainingPipeline:
             target = df.select_dtypes(include=[np.number]).columns[0]
 
         # Prepare features (exclude timestamp and target)
-        feature_cols = [
-            c
-            for c in df.columns
-            if c not in ["timestamp", target] and df[c].dtype in [np.float64, np.int64]
-        ]
+        feature_cols = (
+            df.select_dtypes(include=[np.float64, np.float32, np.int64, np.int8])
+            .columns.drop(["timestamp", target], errors="ignore")
+            .tolist()
+        )
 
         # Drop rows with NaN
-        df_clean = df[feature_cols + [target]].dropna()
+        df_clean = df[[*feature_cols, target]].dropna()
 
-        if len(df_clean) < 50:
+        if len(df_clean) < MIN_ANOMALY_ROWS:
             print("Warning: Not enough data for anomaly detection")
             return {}
 
-        X = df_clean[feature_cols]
-        y = df_clean[target]
+        # One float32 conversion of features and target together; X and y
+        # are views of it, so fit/evaluate reuse the same array
+        values = np.ascontiguousarray(df_clean.to_numpy(dtype=np.float32))
+        X = pd.DataFrame(values[:, :-1], index=df_clean.index, columns=feature_cols, copy=False)
+        y = pd.Series(values[:, -1], index=df_clean.index, name=target, copy=False)
 
         self.anomaly_detector = XGBoostAnomalyDetector()
         self.anomaly_detector.fit(X, y)
@@ -391,15 +547,7 @@ class PrescaleTrainingPipeline:
 
         # Save metrics
         metrics_path = self.output_dir / f"metrics_{timestamp}.json"
-        with open(metrics_path, "w") as f:
-            # Convert numpy types to Python types
-            metrics_serializable = {}
-            for model, m in self.metrics_.items():
-                metrics_serializable[model] = {
-                    k: float(v) if isinstance(v, (np.floating, np.integer)) else v
-                    for k, v in m.items()
-                }
-            json.dump(metrics_serializable, f, indent=2)
+        _write_json(metrics_path, self.metrics_)
 
         print(f"✓ Saved metrics to {metrics_path}")
 
@@ -422,6 +570,15 @@ class PrescaleTrainingPipeline:
                     "window": self.baseline_model.window,
                     "trend_window": self.baseline_model.trend_window,
                 }, f)
+            # Record the format so the loader ignores an older model.json
+            (baseline_dir / "model.json").unlink(missing_ok=True)
+            _write_json(baseline_dir / "metadata.json", {
+                "name": "cpu_forecaster",
+                "version": "1.0.0",
+                "created_at": datetime.utcnow().isoformat(),
+                "framework": "baseline",
+                "format": "pickle",
+            })
             print(f"✓ Saved baseline parameters to {baseline_path}")
         
         # Save Prophet model - as joblib
@@ -435,7 +592,7 @@ class PrescaleTrainingPipeline:
             }, prophet_path)
             print(f"✓ Saved Prophet model to {prophet_path}")
         
-        # Save anomaly detector - just the XGBoost model and scaler
+        # Save anomaly detector - just the XGBoost booster and scaler
         if self.anomaly_detector is not None and self.anomaly_detector.is_fitted_:
             detector_dir = self.output_dir / "anomaly_detector" / "1.0.0"
             detector_dir.mkdir(parents=True, exist_ok=True)
@@ -443,7 +600,7 @@ class PrescaleTrainingPipeline:
             with open(detector_path, "wb") as f:
                 pickle.dump({
                     "type": "xgboost_anomaly",
-                    "model": self.anomaly_detector.model_,  # The raw XGBRegressor
+                    "model": self.anomaly_detector.model_,  # The raw xgb.Booster
                     "scaler": self.anomaly_detector.scaler_,  # StandardScaler
                     "threshold": self.anomaly_detector.threshold_,
                     "feature_names": self.anomaly_detector.feature_names_,
@@ -467,8 +624,7 @@ class PrescaleTrainingPipeline:
                     else None,
                 },
             }
-            with open(summary_path, "w") as f:
-                json.dump(summary, f, indent=2)
+            _write_json(summary_path, summary)
             print(f"✓ Saved data summary to {summary_path}")
 
     def run(
@@ -495,8 +651,13 @@ class PrescaleTrainingPipeline:
         # Stage 1: Fetch data
         df = self.fetch_data(hours=hours, namespace=namespace)
 
-        # Stage 2: Feature engineering
-        df_features = self.engineer_features(df)
+        # Stage 2: Feature engineering. Only the anomaly detector uses the
+        # features, and it skips frames this short anyway
+        if len(df) >= MIN_ANOMALY_ROWS:
+            df_features = self.engineer_features(df)
+        else:
+            print(f"\nSkipping feature engineering: {len(df)} rows < {MIN_ANOMALY_ROWS}")
+            df_features = df
 
         # Stage 3: Train baseline
         self.train_baseline(df)